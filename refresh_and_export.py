@@ -8,9 +8,13 @@ Automated ETL + Plotly Dashboard Export for TNDailySales.csv
 import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.csv as pac
+import pyarrow.parquet as pq
 
 # Resolve BASE_DIR 
 
@@ -21,79 +25,128 @@ except NameError:
 
 DATA_PATH = os.path.join(BASE_DIR, "TNDailySales.csv")
 CLEANED_PATH = os.path.join(BASE_DIR, "data", "TNDailySales_cleaned.csv")
+CACHE_PATH = os.path.join(BASE_DIR, "data", "TNDailySales_cleaned.parquet")
 EXPORT_DIR = os.path.join(BASE_DIR, "outputs")
 
+# Product charts show the top sellers and fold the long tail into "Other"
+TOP_PRODUCTS = 30
+
 os.makedirs(os.path.join(BASE_DIR, "data"), exist_ok=True)
 os.makedirs(EXPORT_DIR, exist_ok=True)
 
-# 1. LOAD RAW DATA
-
-df = pd.read_csv(DATA_PATH)
-
-# 2. FIX COLUMN NAMES (critical to prevent zeros)
-
-df.columns = (
-    df.columns
-    .str.strip()
-    .str.replace("\uFEFF", "", regex=False)  # remove BOM
-    .str.replace("\xa0", "", regex=False)    # remove non-breaking spaces
+# Reuse the cleaned Parquet cache only when it was built from this exact raw
+# CSV: its size and mtime are stored in the cache's metadata and must match
+source_stat = os.stat(DATA_PATH)
+source_key = f"{source_stat.st_size}:{source_stat.st_mtime_ns}".encode()
+use_cache = (
+    os.path.exists(CACHE_PATH)
+    and os.path.exists(CLEANED_PATH)
+    and (pq.read_schema(CACHE_PATH).metadata or {}).get(b"source") == source_key
 )
 
-# 3. STANDARDIZE COLUMN NAMES
-
-rename_map = {
-    "channelname": "ChannelName",
-    "productcategory": "ProductCategory",
-    "date": "Date",
-    "productname": "ProductName",
-    "netweightkgs": "NetWeightKGs",
-    "salescategory": "SalesCategory",
-    "paymenttype": "PaymentType",
-    "customername": "CustomerName",
-}
-
-clean_cols = {}
-for col in df.columns:
-    key = col.lower().replace(" ", "").replace("_", "")
-    clean_cols[col] = rename_map.get(key, col)
-
-df = df.rename(columns=clean_cols)
+if use_cache:
+    df = pd.read_parquet(CACHE_PATH)
+else:
+    # 1. LOAD RAW DATA
 
+    # pyarrow engine parses the file multi-threaded in C
+    df = pd.read_csv(DATA_PATH, engine="pyarrow")
 
-#CLEANING PIPELINE
 
-# Ensure mandatory columns exist
-required = ["ChannelName", "ProductName", "Date", "NetWeightKGs",
-            "ProductCategory", "SalesCategory"]
-for col in required:
-    if col not in df.columns:
-        df[col] = np.nan
+    # 2. FIX COLUMN NAMES (critical to prevent zeros)
 
-# Fix date
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-
-# Fix numeric columns
-df["NetWeightKGs"] = pd.to_numeric(df["NetWeightKGs"], errors="coerce").fillna(0)
-
-
-# Fix text
-for col in ["ChannelName", "ProductCategory", "ProductName", "SalesCategory"]:
-    df[col] = df[col].astype(str).fillna("").str.strip()
-
-# Drop invalid rows
-df = df.dropna(subset=["Date"])
-df = df[df["ProductName"] != ""]
-df = df[df["ChannelName"] != ""]
-
-# Remove duplicates
-df = df.drop_duplicates()
-
-# Derived fields
-df["Month"] = df["Date"].dt.to_period("M").astype(str)
-df["Day"] = df["Date"].dt.date
+    df.columns = (
+        df.columns
+        .str.strip()
+        .str.replace("\uFEFF", "", regex=False)  # remove BOM
+        .str.replace("\xa0", "", regex=False)    # remove non-breaking spaces
+    )
 
-# Save cleaned dataset
-df.to_csv(CLEANED_PATH, index=False)
+    # 3. STANDARDIZE COLUMN NAMES
+
+    rename_map = {
+        "channelname": "ChannelName",
+        "productcategory": "ProductCategory",
+        "date": "Date",
+        "productname": "ProductName",
+        "netweightkgs": "NetWeightKGs",
+        "salescategory": "SalesCategory",
+        "paymenttype": "PaymentType",
+        "customername": "CustomerName",
+    }
+
+    keys = (
+        df.columns
+        .str.lower()
+        .str.replace(" ", "", regex=False)
+        .str.replace("_", "", regex=False)
+    )
+    df.columns = [rename_map.get(key, col) for key, col in zip(keys, df.columns)]
+
+    # Remove duplicates up front so the cleaning steps skip them
+    df = df.drop_duplicates(ignore_index=True)
+
+
+    #CLEANING PIPELINE
+
+    # Ensure mandatory columns exist
+    required = ["ChannelName", "ProductName", "Date", "NetWeightKGs",
+                "ProductCategory", "SalesCategory"]
+    for col in required:
+        if col not in df.columns:
+            df[col] = np.nan
+
+    # Fix date
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+
+    # Fix numeric columns
+    df["NetWeightKGs"] = pd.to_numeric(df["NetWeightKGs"], errors="coerce").fillna(0)
+
+
+    # Fix text: strip on Arrow-backed strings, blank out missing values, then
+    # store as category so groupbys hash integer codes
+    for col in ["ChannelName", "ProductCategory", "ProductName", "SalesCategory"]:
+        df[col] = df[col].astype("string[pyarrow]").str.strip().fillna("").astype("category")
+
+    # Drop invalid rows
+    df = df.dropna(subset=["Date"])
+    df = df[df["ProductName"] != ""]
+    df = df[df["ChannelName"] != ""]
+
+    # Rows can only become identical once cleaned (stripped text, coerced
+    # weights), so deduplicate again on the cleaned values
+    df = df.drop_duplicates()
+
+    # Derived fields
+    # Month is an integer key (months since 1970-01) taken straight from the
+    # datetime64 buffer; "YYYY-MM" labels are built from the distinct keys only
+    df["Month"] = df["Date"].to_numpy().astype("datetime64[M]").astype(np.int32)
+    df["Day"] = df["Date"].dt.date
+
+month_order = np.sort(df["Month"].unique())
+month_names = dict(zip(month_order, month_order.astype("datetime64[M]").astype(str)))
+
+if not use_cache:
+    # Save cleaned dataset
+    # Arrow's C++ writer streams the table out. Date is cast to the coarsest
+    # type that holds every value (day, then whole seconds) so it is written
+    # in the same form pandas used, e.g. 2025-02-03 or 2025-02-03 14:30:00
+    cleaned = pa.Table.from_pandas(df.assign(Month=df["Month"].map(month_names)), preserve_index=False)
+    if (df["Date"] == df["Date"].dt.normalize()).all():
+        date_type = pa.date32()
+    elif (df["Date"] == df["Date"].dt.floor("s")).all():
+        date_type = pa.timestamp("s")
+    else:
+        date_type = None
+    if date_type is not None:
+        date_idx = cleaned.schema.get_field_index("Date")
+        cleaned = cleaned.set_column(
+            date_idx, "Date", cleaned.column(date_idx).cast(date_type)
+        )
+    pac.write_csv(cleaned, CLEANED_PATH)
+    cache = pa.Table.from_pandas(df, preserve_index=False)
+    cache = cache.replace_schema_metadata({**cache.schema.metadata, b"source": source_key})
+    pq.write_table(cache, CACHE_PATH)
 
 
 # DASHBOARDS (PLOTLY EXPORTS)
@@ -102,57 +155,71 @@ df.to_csv(CLEANED_PATH, index=False)
 total_sales = df["NetWeightKGs"].sum()
 total_txn = len(df)
 
+# Per-month totals for each dimension, sliced per month by the dropdown below
+ch = df.groupby(["Month", "ChannelName"], observed=True)["NetWeightKGs"].sum()
+sc = df.groupby(["Month", "SalesCategory"], observed=True)["NetWeightKGs"].sum()
+pr = df.groupby(["Month", "ProductName"], observed=True)["NetWeightKGs"].sum()
+
+# order a Series by value, largest first, with a plain numpy argsort
+def by_value(s):
+    return s.iloc[np.argsort(-s.to_numpy(), kind="stable")]
+
+# top sellers by value plus a single "Other" bar for the rest
+def top_products(s):
+    ranked = by_value(s)
+    if len(ranked) <= TOP_PRODUCTS:
+        return ranked
+    other = pd.Series([ranked.iloc[TOP_PRODUCTS:].sum()], index=["Other"])
+    return pd.concat([ranked.iloc[:TOP_PRODUCTS], other])
+
 # BAR: Channel vs NetWeightKGs
 
 fig_channel = px.bar(
-    df.groupby("ChannelName")["NetWeightKGs"].sum().sort_values(ascending=False).reset_index(),
+    df.groupby("ChannelName", observed=True)["NetWeightKGs"].sum().sort_values(ascending=False).reset_index(),
     x="ChannelName",
     y="NetWeightKGs",
     title="Sales Volume by Channel (KGs)",
 )
-fig_channel.write_html(os.path.join(EXPORT_DIR, "channel_sales.html"))
 
 
 # LINE: Monthly Trend
 
-month_order = sorted(df["Month"].unique())
+monthly = df.groupby("Month")["NetWeightKGs"].sum().rename(index=month_names)
 fig_month = px.line(
-    df.groupby("Month")["NetWeightKGs"].sum().reindex(month_order).reset_index(),
+    monthly.reset_index(),
     x="Month",
     y="NetWeightKGs",
     title="Monthly Sales Trend (KGs)",
     markers=True
 )
-fig_month.write_html(os.path.join(EXPORT_DIR, "month_trend.html"))
 
 
 # BAR: SalesCategory Breakdown
 
 fig_salescat = px.bar(
-    df.groupby("SalesCategory")["NetWeightKGs"].sum().reset_index(),
+    df.groupby("SalesCategory", observed=True)["NetWeightKGs"].sum().reset_index(),
     x="SalesCategory",
     y="NetWeightKGs",
     title="Sales Category Breakdown (KGs)"
 )
-fig_salescat.write_html(os.path.join(EXPORT_DIR, "sales_category.html"))
 
 
 # BAR: ProductName Breakdown
 
 fig_product = px.bar(
-    df.groupby("ProductName")["NetWeightKGs"].sum().reset_index(),
+    top_products(df.groupby("ProductName", observed=True)["NetWeightKGs"].sum())
+    .rename_axis("ProductName").rename("NetWeightKGs").reset_index(),
     x="ProductName",
     y="NetWeightKGs",
     title="Products Ranked by Sales Weight"
 )
-fig_product.write_html(os.path.join(EXPORT_DIR, "product_sales.html"))
 
 # INTERACTIVE DASHBOARD WITH MONTH FILTER
 
 
 from plotly.subplots import make_subplots
 
-unique_months = sorted(df["Month"].unique())
+unique_months = month_order
 
 fig_filtered = make_subplots(
     rows=2, cols=2,
@@ -166,17 +233,18 @@ fig_filtered = make_subplots(
 
 
 
-def filter_month(m):
-    return df[df["Month"] == m]
-
 # initial month
-initial = filter_month(unique_months[0])
+initial_channel = by_value(ch.loc[unique_months[0]])
+initial_salescat = by_value(sc.loc[unique_months[0]])
+initial_product = top_products(pr.loc[unique_months[0]])
+
+
 
 # Channel
 fig_filtered.add_trace(
     go.Bar(
-        x=initial.groupby("ChannelName")["NetWeightKGs"].sum().index,
-        y=initial.groupby("ChannelName")["NetWeightKGs"].sum().sort_values(ascending=False).values,
+        x=initial_channel.index,
+        y=initial_channel.values,
         name="Channel"
     ),
     row=1, col=1
@@ -185,8 +253,8 @@ fig_filtered.add_trace(
 #Sales category
 fig_filtered.add_trace(
     go.Bar(
-        x=initial.groupby("SalesCategory")["NetWeightKGs"].sum().index,
-        y=initial.groupby("SalesCategory")["NetWeightKGs"].sum().sort_values(ascending=False).values,
+        x=initial_salescat.index,
+        y=initial_salescat.values,
         name="SalesCategory"
     ),
     row=1, col=2
@@ -197,8 +265,8 @@ fig_filtered.add_trace(
 # Product
 fig_filtered.add_trace(
     go.Bar(
-        x=initial.groupby("ProductName")["NetWeightKGs"].sum().index,
-        y=initial.groupby("ProductName")["NetWeightKGs"].sum().sort_values(ascending=False).values,
+        x=initial_product.index,
+        y=initial_product.values,
         name="Product"
     ),
     row=2, col=1
@@ -207,8 +275,8 @@ fig_filtered.add_trace(
 # Monthly trend (full)
 fig_filtered.add_trace(
     go.Scatter(
-        x=df.groupby("Month")["NetWeightKGs"].sum().index,
-        y=df.groupby("Month")["NetWeightKGs"].sum().values,
+        x=monthly.index,
+        y=monthly.values,
         mode="lines+markers",
         name="Trend"
     ),
@@ -218,25 +286,27 @@ fig_filtered.add_trace(
 # Buttons for dropdown
 buttons = []
 for m in unique_months:
-    dff = filter_month(m)
+    ch_m = by_value(ch.loc[m])
+    sc_m = by_value(sc.loc[m])
+    pr_m = top_products(pr.loc[m])
 
     buttons.append(
         dict(
-            label=m,
+            label=month_names[m],
             method="update",
             args=[
                 {
                     "x": [
-                        dff.groupby("ChannelName")["NetWeightKGs"].sum().index,
-                        dff.groupby("SalesCategory")["NetWeightKGs"].sum().index,
-                        dff.groupby("ProductName")["NetWeightKGs"].sum().index,
-                        df.groupby("Month")["NetWeightKGs"].sum().index,
+                        ch_m.index,
+                        sc_m.index,
+                        pr_m.index,
+                        monthly.index,
                     ],
                     "y": [
-                        dff.groupby("ChannelName")["NetWeightKGs"].sum().sort_values(ascending=False).values,
-                        dff.groupby("SalesCategory")["NetWeightKGs"].sum().sort_values(ascending=False).values,
-                        dff.groupby("ProductName")["NetWeightKGs"].sum().sort_values(ascending=False).values,
-                        df.groupby("Month")["NetWeightKGs"].sum().values,
+                        ch_m.values,
+                        sc_m.values,
+                        pr_m.values,
+                        monthly.values,
                     ]
                 }
             ]
@@ -255,34 +325,58 @@ fig_filtered.update_layout(
     height=900
 )
 
-fig_filtered.write_html(os.path.join(EXPORT_DIR, "interactive_dashboard.html"))
+# Export each chart to its own file, overlapping the writes on a thread pool
+
+exports = [
+    (fig_channel, "channel_sales.html"),
+    (fig_month, "month_trend.html"),
+    (fig_salescat, "sales_category.html"),
+    (fig_product, "product_sales.html"),
+    (fig_filtered, "interactive_dashboard.html"),
+]
+with ThreadPoolExecutor(max_workers=len(exports)) as ex:
+    futures = [ex.submit(fig.write_html, os.path.join(EXPORT_DIR, name)) for fig, name in exports]
+    for future in futures:
+        future.result()
 
 
 # appending all plotly charts in one html file
 
 master_path = os.path.join(EXPORT_DIR, "master_dashboard.html")
 
-with open(master_path, "w", encoding="utf-8") as f:
-    f.write("<html><head><title>Poultry Sales Dashboard</title></head><body>")
-    f.write("<h1><center>TNU Sales Dashboard</center></h1>")
-    f.write("<p>Last Updated: " + str(datetime.now()) + "</p>")
+# Serialise each chart fragment once
+channel_html = fig_channel.to_html(full_html=False, include_plotlyjs='cdn')
+month_html = fig_month.to_html(full_html=False, include_plotlyjs=False)
+salescat_html = fig_salescat.to_html(full_html=False, include_plotlyjs=False)
+product_html = fig_product.to_html(full_html=False, include_plotlyjs=False)
+filtered_html = fig_filtered.to_html(full_html=False, include_plotlyjs=False)
 
-    f.write("<h2><center>Sales Volume by Channel</center></h2>")
-    f.write(fig_channel.to_html(full_html=False, include_plotlyjs='cdn'))
+parts = [
+    "<html><head><title>Poultry Sales Dashboard</title></head><body>",
+    "<h1><center>TNU Sales Dashboard</center></h1>",
+    "<p>Last Updated: " + str(datetime.now()) + "</p>",
 
-    f.write("<h2><center>Monthly Sales Trend</center></h2>")
-    f.write(fig_month.to_html(full_html=False, include_plotlyjs=False))
+    "<h2><center>Sales Volume by Channel</center></h2>",
+    channel_html,
 
-    f.write("<h2><center>Sales Category Breakdown</center></h2>")
-    f.write(fig_salescat.to_html(full_html=False, include_plotlyjs=False))
+    "<h2><center>Monthly Sales Trend</center></h2>",
+    month_html,
 
-    f.write("<h2><center>Product Sales Ranking</center></h2>")
-    f.write(fig_product.to_html(full_html=False, include_plotlyjs=False))
+    "<h2><center>Sales Category Breakdown</center></h2>",
+    salescat_html,
 
-    f.write("<h2><center>Interactive Dashboard with Month Slicer</center></h2>")
-    f.write(fig_filtered.to_html(full_html=False, include_plotlyjs=False))
+    "<h2><center>Product Sales Ranking</center></h2>",
+    product_html,
 
-    f.write("</body></html>")
+    "<h2><center>Interactive Dashboard with Month Slicer</center></h2>",
+    filtered_html,
+
+    "</body></html>",
+]
+
+# one write of the assembled page
+with open(master_path, "w", encoding="utf-8") as f:
+    f.write("".join(parts))
 
 print("Master Dashboard saved to:", master_path)
 